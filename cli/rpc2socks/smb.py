@@ -1,10 +1,13 @@
 # Copyright (c) Lexfo
 # SPDX-License-Identifier: BSD-3-Clause
 
+import concurrent.futures
 import contextlib
+import functools
 import io
 import os
 import socket
+import threading
 import time
 import types
 import weakref
@@ -64,10 +67,17 @@ __all__ = (
     "SmbError", "SmbTimeoutError",
     "DcomConnection", "SmbConfig", "SmbConnection", "SmbNamedPipeHandle",
     "SmbNamedPipeDedicated",
-    "load_kerberos_keytab", "query_host_arch", "put_file", "delete_file")
+    "load_kerberos_keytab", "query_host_arch", "query_host_arch_many",
+    "put_file", "delete_file")
 
 logger = logging.get_internal_logger(__name__)
 
+# query_host_arch() results cache: {(host, port): is64bit}
+# only successful results are cached
+_HOST_ARCH_CACHE_MAX = 256
+_host_arch_cache = {}
+_host_arch_cache_lock = threading.Lock()
+
 
 class SmbError(Exception):
     pass
@@ -182,8 +192,10 @@ class DcomConnection:
         self._dcom_conn = dcom_conn
 
     def __del__(self):
-        with contextlib.suppress(Exception):
+        try:
             self.close()
+        except Exception:
+            pass
 
     def __getattr__(self, name):
         return getattr(self._dcom_conn, name)
@@ -210,10 +222,14 @@ class SmbConnection:
 
         self._smb_conn = smb_conn
         self._ipc_tree_id = None
+        self._srvsvc_transport = None
+        self._srvsvc_dce = None
 
     def __del__(self):
-        with contextlib.suppress(Exception):
+        try:
             self.close()
+        except Exception:
+            pass
 
     def __getattr__(self, name):
         return getattr(self._smb_conn, name)
@@ -237,6 +253,8 @@ class SmbConnection:
             return "{}[{}]".format(rhost_name, rport)
 
     def close(self):
+        self._close_srvsvc()
+
         if self._ipc_tree_id is not None:
             try:
                 self._smb_conn.disconnectTree(self._ipc_tree_id)
@@ -311,34 +329,20 @@ class SmbConnection:
                     self.set_timeout(prev_timeout)
 
     def list_shares(self):
-        rpctransport = None
-        dce = None
-
-        try:
-            rpctransport = impkt_transport.SMBTransport(
-                remoteName=self._smb_conn.getRemoteHost(),  # getRemoteName(),
-                remote_host=self._smb_conn.getRemoteHost(),
-                dstport=self._smb_conn._sess_port,
-                smb_connection=self._smb_conn,
-                filename="\\srvsvc")
-
-            dce = rpctransport.get_dce_rpc()
-            dce.connect()
-            dce.bind(impkt_srvs.MSRPC_UUID_SRVS)
-            resp = impkt_srvs.hNetrShareEnum(dce, 1)
-            resp = resp["InfoStruct"]["ShareInfo"]["Level1"]["Buffer"]
-        except Exception as exc:
-            raise SmbError(str(exc))
-        finally:
-            if dce is not None:
-                with contextlib.suppress(Exception):
-                    dce.disconnect()
-
-            if rpctransport is not None:
-                with contextlib.suppress(Exception):
-                    rpctransport.disconnect()
+        # the srvsvc binding is kept open so that subsequent calls do not have
+        # to open the pipe and to bind again; it is re-established once in case
+        # the kept binding turns out to be broken
+        while True:
+            reused = self._srvsvc_dce is not None
 
-        return resp
+            try:
+                dce = self._open_srvsvc()
+                resp = impkt_srvs.hNetrShareEnum(dce, 1)
+                return resp["InfoStruct"]["ShareInfo"]["Level1"]["Buffer"]
+            except Exception as exc:
+                self._close_srvsvc()
+                if not reused:
+                    raise SmbError(str(exc))
 
     # impacket's SMBConnection.listShares does not instantiate SMBTransport
     # properly
@@ -380,6 +384,34 @@ class SmbConnection:
 
         return SmbNamedPipeHandle(pipe_name, self, self.ipc_tree_id, file_id)
 
+    def _open_srvsvc(self):
+        if self._srvsvc_dce is None:
+            self._srvsvc_transport = impkt_transport.SMBTransport(
+                remoteName=self._smb_conn.getRemoteHost(),  # getRemoteName(),
+                remote_host=self._smb_conn.getRemoteHost(),
+                dstport=self._smb_conn._sess_port,
+                smb_connection=self._smb_conn,
+                filename="\\srvsvc")
+
+            dce = self._srvsvc_transport.get_dce_rpc()
+            dce.connect()
+            dce.bind(impkt_srvs.MSRPC_UUID_SRVS)
+
+            self._srvsvc_dce = dce
+
+        return self._srvsvc_dce
+
+    def _close_srvsvc(self):
+        if self._srvsvc_dce is not None:
+            with contextlib.suppress(Exception):
+                self._srvsvc_dce.disconnect()
+            self._srvsvc_dce = None
+
+        if self._srvsvc_transport is not None:
+            with contextlib.suppress(Exception):
+                self._srvsvc_transport.disconnect()
+            self._srvsvc_transport = None
+
 
 class SmbNamedPipeHandle:
     """Must be instantiated with `SmbConnection.spawn_named_pipe`"""
@@ -393,8 +425,10 @@ class SmbNamedPipeHandle:
         self.file_id = file_id
 
     def __del__(self):
-        with contextlib.suppress(Exception):
+        try:
             self.close()
+        except Exception:
+            pass
 
     @property
     def smbconn(self):
@@ -527,8 +561,10 @@ class SmbNamedPipeDedicated:
         self.pipe = self.smbconn.spawn_named_pipe(pipe_name)
 
     def __del__(self):
-        with contextlib.suppress(Exception):
+        try:
             self.close()
+        except Exception:
+            pass
 
         # order matters
         self.pipe = None
@@ -567,7 +603,8 @@ def load_kerberos_keytab(keytab_file, username, domain):
             f"{username}@{domain} not found in keytab: {keytab_file}")
 
 
-def query_host_arch(host_name_or_addr, *, port=135, timeout=3.0):
+def query_host_arch(host_name_or_addr, *, port=135, timeout=3.0,
+                    use_cache=True):
     """
     Use host's DCERPC service (port 135) to query for a specific 64-bit only
     feature and check the response.
@@ -575,14 +612,71 @@ def query_host_arch(host_name_or_addr, *, port=135, timeout=3.0):
     Return `True` if host is 64-bit, `False` if host is 32-bit, or `None` in
     case of an error.
 
+    Successful results are cached per host and port for the lifetime of the
+    process, unless *use_cache* is false.
+
     Ref: ``impacket/examples/getArch.py``
     """
     # not really an SMB-related function, it probably should be moved to a
     # DCERPC-dedicated module
 
+    host_name_or_addr = host_name_or_addr.strip()
+    cache_key = (host_name_or_addr, port)
+
+    if use_cache:
+        with _host_arch_cache_lock:
+            is64bit = _host_arch_cache.get(cache_key, None)
+            if is64bit is not None:
+                return is64bit
+
+    is64bit = _query_host_arch_impl(host_name_or_addr, port, timeout)
+
+    if is64bit is not None:
+        with _host_arch_cache_lock:
+            if (cache_key not in _host_arch_cache and
+                    len(_host_arch_cache) >= _HOST_ARCH_CACHE_MAX):
+                # evict the oldest entry
+                del _host_arch_cache[next(iter(_host_arch_cache))]
+
+            _host_arch_cache[cache_key] = is64bit
+
+    return is64bit
+
+
+def query_host_arch_many(hosts, *, port=135, timeout=None, max_workers=64,
+                         use_cache=True):
+    """
+    Like `query_host_arch` but probe multiple *hosts* concurrently.
+
+    *timeout* defaults to ``1.5`` seconds per host when more than one host is
+    probed, ``3.0`` otherwise.
+
+    Return a `dict` of the form ``{host: is64bit}``.
+    """
+    hosts = [host.strip() for host in hosts]
+    if not hosts:
+        return {}
+
+    if timeout is None:
+        timeout = 1.5 if len(hosts) > 1 else 3.0
+
+    max_workers = max(1, min(max_workers, len(hosts)))
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="query_host_arch") as executor:
+        futures = {
+            host: executor.submit(
+                query_host_arch, host, port=port, timeout=timeout,
+                use_cache=use_cache)
+            for host in hosts}
+
+        return {host: future.result() for host, future in futures.items()}
+
+
+def _query_host_arch_impl(host_name_or_addr, port, timeout):
     NDR64_SYNTAX = ("71710533-BEBA-4937-8319-B5DBEF9CCC36", "1.0")
 
-    host_name_or_addr = host_name_or_addr.strip()
     binding = f"ncacn_ip_tcp:{host_name_or_addr}[{port}]"
 
     transport = None
@@ -621,24 +715,40 @@ def query_host_arch(host_name_or_addr, *, port=135, timeout=3.0):
     return is64bit
 
 
+@functools.lru_cache(maxsize=1024)
+def _norm_smb_path(path, *, strip=False):
+    """
+    Convert *path* to a backslash-separated SMB path, optionally stripped from
+    its leading and trailing backslashes.
+
+    Results are cached since `put_file` and `delete_file` are typically called
+    repeatedly with the same *share* and *destname* values.
+    """
+    path = path.replace("/", "\\")
+    if strip:
+        path = path.strip("\\")
+
+    return path
+
+
 def put_file(*, fileish, smbconfig, share, destname):
     if hasattr(fileish, "read"):
         # CAUTION: this assumes file is opened in binary mode
         own_file = False
         fin = fileish
     elif isinstance(fileish, str) or hasattr(fileish, "__fspath__"):
+        # unbuffered: impacket reads chunks of MaxWriteSize bytes at once, so an
+        # intermediate BufferedReader would only add an extra copy per chunk
         own_file = True
-        fin = open(os.fspath(fileish), mode="rb")
+        fin = open(os.fspath(fileish), mode="rb", buffering=0)
     elif isinstance(fileish, bytes):
         own_file = True
         fin = io.BytesIO(fileish)
     else:
         raise ValueError("fileish")
 
-    share = share.replace("/", "\\")
-    share = share.strip("\\")
-
-    destname = destname.replace("/", "\\")
+    share = _norm_smb_path(share, strip=True)
+    destname = _norm_smb_path(destname)
 
     display_dest_addr = f"\\\\{smbconfig.addr_str}\\{share}\\{destname}"
     smbconn = None
@@ -666,10 +776,8 @@ def put_file(*, fileish, smbconfig, share, destname):
 
 
 def delete_file(*, smbconfig, share, destname):
-    share = share.replace("/", "\\")
-    share = share.strip("\\")
-
-    destname = destname.replace("/", "\\")
+    share = _norm_smb_path(share, strip=True)
+    destname = _norm_smb_path(destname)
 
     display_dest_addr = f"\\\\{smbconfig.addr_str}\\{share}\\{destname}"
     smbconn = None
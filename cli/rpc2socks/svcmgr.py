@@ -18,6 +18,16 @@ logger = logging.get_internal_logger(__name__)
 
 
 class ServiceManager:
+    """
+    Remote Windows Service Control Manager over DCERPC (``\\svcctl`` named
+    pipe).
+
+    `open` establishes the SMB connection and binds the DCERPC pipe once, which
+    is then reused by every subsequent `create_service` and `delete_service`
+    call until `close` is called. So a batch of operations should be enclosed
+    by a single `open`/`close` pair rather than one per operation.
+    """
+
     def __init__(self, *, smbconfig):
         assert isinstance(smbconfig, smb.SmbConfig)
 
@@ -28,8 +38,10 @@ class ServiceManager:
         self._svcmgr = None
 
     def __del__(self):
-        with contextlib.suppress(Exception):
+        try:
             self.close()
+        except Exception:
+            pass
 
     def close(self):
         if self._svcmgr is not None:
@@ -95,11 +107,12 @@ class ServiceManager:
             assert svc_handle is not None
 
             # start service
-            try:
-                impkt_scmr.hRStartServiceW(self._rpcsvcctl, svc_handle)
-            except Exception as exc:
-                if str(exc).find("ERROR_SERVICE_ALREADY_RUNNING") < 0:
-                    raise
+            if start:
+                try:
+                    impkt_scmr.hRStartServiceW(self._rpcsvcctl, svc_handle)
+                except Exception as exc:
+                    if str(exc).find("ERROR_SERVICE_ALREADY_RUNNING") < 0:
+                        raise
         finally:
             if svc_handle is not None:
                 with contextlib.suppress(Exception):
@@ -158,6 +171,10 @@ class ServiceManager:
             smb_connection=self._smbconn,
             filename="\\svcctl")
 
+        # note: no DCERPC-level auth level is set on purpose. The pipe is
+        # already protected by the SMB session, so that PDUs do not get signed
+        # nor sealed a second time, and impacket does not fragment them below
+        # the max xmit size negotiated at bind time
         self._rpcsvcctl = self._smbtransport.get_dce_rpc()
         self._rpcsvcctl.connect()
         self._rpcsvcctl.bind(impkt_scmr.MSRPC_UUID_SCMR)
@@ -2,8 +2,11 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 import datetime
+import functools
 import os
+import string
 import sys
+import weakref
 
 __all__ = (
     "UNSET",
@@ -15,6 +18,15 @@ __all__ = (
 #: Used to allow `None` to be a regular value in some cases
 UNSET = object()
 
+# get_fullname() cache: {type: fullname}
+_fullname_cache = weakref.WeakKeyDictionary()
+
+# ids of the streams already reconfigured by reconfigure_output_streams()
+_reconfigured_streams = set()
+
+# translation table to strip ASCII letters from a str
+_ASCII_LETTERS_DELETION = str.maketrans("", "", string.ascii_letters)
+
 
 class NoDict(object):
     """Subclass `object` to deny the creation of a ``__dict__``"""
@@ -25,25 +37,26 @@ def ask(question, *, choices="Yn", ofile=sys.stderr):
     if not choices or not isinstance(choices, str):
         raise ValueError("choices")
 
-    default = ""
-    for c in choices:
-        if c.lower() == c.upper():
-            raise ValueError(f'not a valid choice character "{c}"')
-        elif c == c.upper():
-            if default:
-                raise ValueError("multiple default choices in: " + choices)
-            else:
-                default = c.lower()
+    prompt_suffix, default, choices = _prep_ask_choices(choices)
 
     question = question.strip().rstrip("?").rstrip()
-    question += "? [" + "/".join(choices) + "] "
+    question += prompt_suffix
 
-    choices = choices.lower()
+    # input() writes its prompt to sys.stdout and flushes it by itself
+    prompt_via_input = ofile is sys.stdout
 
     while True:
-        ofile.write(question)
-        ofile.flush()
-        ans = input()
+        if prompt_via_input:
+            ans = input(question)
+        else:
+            # the prompt has been flushed already, so read stdin directly
+            # rather than letting input() flush stdout and stderr once again
+            ofile.write(question)
+            ofile.flush()
+            ans = sys.stdin.readline()
+            if not ans:
+                raise EOFError
+            ans = ans.rstrip("\r\n")
         # ofile.write("\n")
         # ofile.flush()
 
@@ -63,6 +76,31 @@ def ask(question, *, choices="Yn", ofile=sys.stderr):
             return ans
 
 
+@functools.lru_cache(maxsize=32)
+def _prep_ask_choices(choices):
+    """
+    Validate *choices* for `ask` and return a tuple
+    ``(prompt_suffix, default_choice, lowered_choices)``.
+
+    Cached since `ask` is usually called with the same literal *choices*.
+    """
+    # ASCII letters are stripped in a single pass, remaining characters - if
+    # any - must be cased letters
+    for c in choices.translate(_ASCII_LETTERS_DELETION):
+        if c.lower() == c.upper():
+            raise ValueError(f'not a valid choice character "{c}"')
+
+    defaults = [c for c in choices if c.isupper()]
+    if len(defaults) > 1:
+        raise ValueError("multiple default choices in: " + choices)
+
+    default = defaults[0].lower() if defaults else ""
+
+    prompt_suffix = "? [" + "/".join(choices) + "] "
+
+    return prompt_suffix, default, choices.lower()
+
+
 def get_fullname(something):
     """Get the full Python name of *something*"""
     something_orig = something
@@ -74,6 +112,10 @@ def get_fullname(something):
             something = UNSET
 
     if something != UNSET and isinstance(something, type):
+        fullname = _fullname_cache.get(something, None)
+        if fullname is not None:
+            return fullname
+
         modname = something.__module__
 
         if (not modname or
@@ -84,6 +126,7 @@ def get_fullname(something):
             fullname = modname + "." + something.__name__
 
         if fullname:
+            _fullname_cache[something] = fullname
             return fullname
 
     raise ValueError(
@@ -91,7 +134,12 @@ def get_fullname(something):
 
 
 def get_fullnames(somethings):
-    return [get_fullname(klass) for klass in somethings]
+    """
+    Generate the full Python name of every object of *somethings*.
+
+    Wrap the call with `list` if a list is needed.
+    """
+    return (get_fullname(klass) for klass in somethings)
 
 
 def humanize_elapsed_seconds(seconds):
@@ -99,15 +147,44 @@ def humanize_elapsed_seconds(seconds):
     Convert a value in *seconds* (`int` or `float`) and return a `str` of the
     form ``0:00:00.123`` or ``0:00:00``
     """
+    # split and round the same way timedelta does
+    secs = int(seconds)
+    usecs = round((seconds - secs) * 1000000)
+    if usecs >= 1000000:
+        secs += 1
+        usecs -= 1000000
+
+    # str(timedelta) prepends a number of days, possibly negative, so only deal
+    # with the common case of less than a day here
+    if seconds < 0 or secs >= 86400:
+        return _humanize_timedelta(seconds)
+
+    mins, secs = divmod(secs, 60)
+    hours, mins = divmod(mins, 60)
+
+    if not usecs:
+        return "%d:%02d:%02d" % (hours, mins, secs)
+    elif usecs % 1000:
+        return ("%d:%02d:%02d.%06d" % (hours, mins, secs, usecs)).rstrip("0")
+    else:
+        # "0:00:00.123000" to "0:00:00.123"
+        return ("%d:%02d:%02d.%03d" % (
+            hours, mins, secs, usecs // 1000)).rstrip("0")
+
+
+def _humanize_timedelta(seconds):
     elapsed = str(datetime.timedelta(seconds=seconds))
 
     # "0:00:00.123000" to "0:00:00.123"
-    # caution: when elapsed time is zero, str(timedelta) returns "0:00:00",
-    # hence the test
-    if "." in elapsed:
-        elapsed = elapsed.rstrip("0")
-        if elapsed[-1] == ".":  # in case result was "x:xx:xx.000"
-            elapsed += "000"
+    # caution: str(timedelta) omits the fractional part when microseconds are
+    # zero (e.g. "0:00:00"), otherwise it is always 6-digit long and has at
+    # least one non-zero digit, so that the dot can never be stripped
+    if elapsed[-7:-6] == ".":
+        if elapsed.endswith("000"):
+            elapsed = elapsed[:-3]
+
+        if elapsed[-1] == "0":
+            elapsed = elapsed.rstrip("0")
 
     return elapsed
 
@@ -117,11 +194,18 @@ def reconfigure_output_streams():
     On Windows with Python 3.7+ only, reconfigure `sys.stdout` and `sys.stderr`
     to avoid encoding errors.
 
-    Does nothing in any other environment.
+    Does nothing in any other environment, or for a stream that has been
+    reconfigured already.
     """
     if os.name == "nt" and sys.version_info >= (3, 7):
         for stream in (sys.stdout, sys.stderr):
+            stream_id = id(stream)
+            if stream_id in _reconfigured_streams:
+                continue
+
             if stream.isatty():
                 stream.reconfigure(errors="replace")
             else:
                 stream.reconfigure(encoding="utf-8", errors="strict")
+
+            _reconfigured_streams.add(stream_id)
@@ -7,7 +7,7 @@ Windows.
 """
 
 import cmd
-import contextlib
+import weakref
 
 try:
     from . import winctrlc
@@ -21,14 +21,23 @@ __all__ = ("Cmd", )
 class Cmd(cmd.Cmd):
     def __init__(self, *args, **kwargs):
         if winctrlc is not None:
-            winctrlc.winctrlc_register_callback(self._on_cmd_winctrlc)
+            # CAUTION: the registered callback must not hold a strong reference
+            # to self, otherwise neither the callbacks list of winctrlc nor the
+            # finalizer would ever let this object be collected
+            selfref = weakref.ref(self)
 
-        super().__init__(*args, **kwargs)
+            def _winctrlc_callback():
+                cmd = selfref()
+                if cmd is not None:
+                    return cmd._on_cmd_winctrlc()
+
+            winctrlc.winctrlc_register_callback(_winctrlc_callback)
 
-    def __del__(self):
-        with contextlib.suppress(Exception):
-            if winctrlc is not None:
-                winctrlc.winctrlc_unregister_callback(self._on_cmd_winctrlc)
+            self._winctrlc_finalizer = weakref.finalize(
+                self, winctrlc.winctrlc_unregister_callback,
+                _winctrlc_callback)
+
+        super().__init__(*args, **kwargs)
 
     def do_KeyboardInterrupt(self, argsline):
         return True
@@ -18,6 +18,12 @@ class Observer:
     def __init__(self):
         super().__init__()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # so that error paths do not have to resolve it again
+        cls._observer_fullname = _utils.get_fullname(cls)
+
     def _observer_event_launch_pad(self, dispatcher, event_name, event_method,
                                    *args, **kwargs):
         """
@@ -30,26 +36,50 @@ class Observer:
             try:
                 event_method(*args, **kwargs)
             except Exception:
-                if dispatcher.dispatcher_raise_errors:
+                # a single load of a consistent snapshot of the config
+                raise_errors, logger = dispatcher._dispatcher_cfg
+                if raise_errors:
                     raise
                 else:
-                    # keep local ref so that we do not need to lock its access
-                    logger = dispatcher.dispatcher_logger
                     if logger is not None:
                         logger.exception(
-                            f"{_utils.get_fullname(self)}.{event_name} raised "
+                            f"{self._observer_fullname}.{event_name} raised "
                             f"an exception")
 
 
+Observer._observer_fullname = _utils.get_fullname(Observer)
+
+
 class Dispatcher:
     def __init__(self, *, dispatcher_raise_errors=False, dispatcher_logger=None,
                  observers=()):
         super().__init__()
 
         self._dispatcher_lock = threading.Lock()
-        self._dispatcher_observers = []
-        self._dispatcher_raise_errors = dispatcher_raise_errors
-        self._dispatcher_logger = dispatcher_logger
+        # {id(observer): weakref.ref(observer)}; insertion-ordered so that
+        # observers get notified in the order they registered. Keyed by id()
+        # so that observers do not have to be hashable, and so that two
+        # observers that compare equal still get registered both.
+        self._dispatcher_registry = {}
+        # copy-on-write snapshot of the registry's values, published by
+        # writers so that notify_observers() does not have to lock
+        self._dispatcher_observers = ()
+
+        # callback of the observers' weak references so that dead ones get
+        # reaped as soon as they are collected; it only holds a weak reference
+        # to this dispatcher to avoid a reference cycle
+        selfref = weakref.ref(self)
+
+        def _reap(obsw):
+            dispatcher = selfref()
+            if dispatcher is not None:
+                dispatcher._reap_observer(obsw)
+
+        self._dispatcher_reap = _reap
+        # (raise_errors, logger); replaced as a whole by the setters so that
+        # readers get a consistent pair without locking
+        self._dispatcher_cfg = (dispatcher_raise_errors, dispatcher_logger)
+        self._dispatcher_cfg_lock = threading.Lock()
 
         if isinstance(observers, (tuple, list)):
             for obs in observers:
@@ -60,83 +90,109 @@ class Dispatcher:
 
     @property
     def dispatcher_raise_errors(self):
-        return self._dispatcher_raise_errors
+        return self._dispatcher_cfg[0]
 
     @property
     def dispatcher_logger(self):
-        return self._dispatcher_logger
+        return self._dispatcher_cfg[1]
+
+    # note: the setters below do not need the lock that guards observers
+    # registration; they only serialize among themselves so that concurrent
+    # calls do not overwrite each other's field, while readers just load the
+    # tuple
 
     def set_dispatcher_raise_errors(self, enable):
-        with self._dispatcher_lock:
-            self._dispatcher_raise_errors = bool(enable)
+        with self._dispatcher_cfg_lock:
+            self._dispatcher_cfg = (bool(enable), self._dispatcher_cfg[1])
 
     def set_dispatcher_logger(self, logger):
-        with self._dispatcher_lock:
-            self._dispatcher_logger = logger  # can be None
+        with self._dispatcher_cfg_lock:
+            # logger can be None
+            self._dispatcher_cfg = (self._dispatcher_cfg[0], logger)
 
     def register_observer(self, observer):
+        key = id(observer)
+
         with self._dispatcher_lock:
-            for obsw in self._dispatcher_observers:
-                obs = obsw()
-                if obs is observer:
-                    break
-            else:
-                self._dispatcher_observers.append(weakref.ref(observer))
+            obsw = self._dispatcher_registry.get(key)
+            if obsw is None or obsw() is not observer:
+                # note: an entry with the same id but another referent is the
+                # dead reference of a collected observer that could not be
+                # reaped yet, since ids get reused
+                self._dispatcher_registry.pop(key, None)
+                self._dispatcher_registry[key] = weakref.ref(
+                    observer, self._dispatcher_reap)
+                self._publish_observers()
 
     def unregister_observer(self, observer):
+        # unlocked fast exit, see notify_observers()
+        if not self._dispatcher_observers:
+            return False
+
+        key = id(observer)
+
         with self._dispatcher_lock:
-            for idx, obsw in enumerate(self._dispatcher_observers):
-                obs = obsw()
-                if obs is observer:
-                    del self._dispatcher_observers[idx]
-                    return True
+            obsw = self._dispatcher_registry.get(key)
+            if obsw is None or obsw() is not observer:
+                return False
 
-        return False
+            del self._dispatcher_registry[key]
+            self._publish_observers()
+            return True
 
     def unregister_all_observers(self):
-        with self._dispatcher_lock:
-            self._dispatcher_observers = []
+        # unlocked fast exit, see notify_observers()
+        if not self._dispatcher_observers:
+            return
 
-    def notify_observers(self, event_name, *args, **kwargs):
         with self._dispatcher_lock:
-            if not self._dispatcher_observers:
-                return
-
-            observers = self._dispatcher_observers[:]
+            self._dispatcher_registry = {}
+            self._dispatcher_observers = ()
 
-        cleanup_required = False
+    def notify_observers(self, event_name, *args, **kwargs):
+        # no lock needed: the tuple is never modified in place, writers publish
+        # a new one instead. An empty tuple means there is no live observer, an
+        # observer being registered concurrently would just miss this event as
+        # if it had registered right after it.
+        observers = self._dispatcher_observers
+        if not observers:
+            return
 
         for obsw in observers:
             obs = obsw()
             if obs is None:
-                cleanup_required = True
-                continue
+                continue  # about to be reaped
 
-            try:
-                dispatch_method = getattr(obs, "_observer_event_launch_pad")
-            except AttributeError:
+            # note: both are looked up on the observer upon every call rather
+            # than cached per class, so that an override made at any time on
+            # the observer itself or on its class is honored
+            launch_pad = getattr(obs, "_observer_event_launch_pad", None)
+            if launch_pad is None:
                 raise NotImplementedError(
                     f"{_utils.get_fullname(obs)}._observer_event_launch_pad() "
                     f"not implemented; object not derived from Observer?")
 
+            launch_pad(
+                self, event_name, getattr(obs, event_name, None),
+                *args, **kwargs)
+
+    def _publish_observers(self):
+        # CAUTION: caller must hold self._dispatcher_lock
+        # also get rid of the dead observers that could not be reaped
+        registry = self._dispatcher_registry
+        dead_keys = [key for key, obsw in registry.items() if obsw() is None]
+        for key in dead_keys:
+            del registry[key]
+
+        self._dispatcher_observers = tuple(registry.values())
+
+    def _reap_observer(self, obsw):
+        # called by the garbage collector, possibly from a thread that already
+        # holds the lock, hence the non-blocking attempt; on failure the dead
+        # reference stays registered and is just skipped by notify_observers()
+        # until the next publication purges it
+        if self._dispatcher_lock.acquire(blocking=False):
             try:
-                event_method = getattr(obs, event_name)
-            except AttributeError:
-                # if self._dispatcher_logger is not None:
-                #     self._dispatcher_logger.warning(
-                #         f"{_utils.get_fullname(self)}.{event_name}() not "
-                #         f"implemented")
-
-                event_method = None
-
-            dispatch_method(self, event_name, event_method, *args, **kwargs)
-
-        if cleanup_required:
-            with self._dispatcher_lock:
-                observers = []
-
-                for obsw in self._dispatcher_observers:
-                    if obsw() is not None:
-                        observers.append(obsw)
-
-                self._dispatcher_observers = observers
+                self._publish_observers()
+            finally:
+                self._dispatcher_lock.release()
@@ -1,6 +1,9 @@
 # Copyright (c) Lexfo
 # SPDX-License-Identifier: BSD-3-Clause
 
+import functools
+import threading
+
 from .vendor import loggex
 
 
@@ -21,6 +24,12 @@ PPRINT = loggex.PPRINT
 HINFO = loggex.HINFO
 ASSERTION = loggex.ASSERTION
 
+# deferred formatting of log arguments
+lazy_pformat = loggex.lazy_pformat
+
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
 
 def get_internal_logger(name=None):
     """
@@ -30,20 +39,39 @@ def get_internal_logger(name=None):
     If *name* is false or empty, the returned logger is package's default
     logger.
     """
-    if not name:
-        name = PACKAGE_NAME
-    else:
-        name = name.rsplit(".", maxsplit=1)[-1]
-        name = PACKAGE_NAME + "." + name
+    _ensure_bootstrap()
 
-    return loggex.getLogger(name)
+    return loggex.getLogger(_resolve_internal_logger_name(name))
 
 
 def set_root_log_level(new_level):
     """Set root logger's level"""
+    _ensure_bootstrap()
     return loggex.getLogger(None).setLevel(new_level)
 
 
+@functools.lru_cache(maxsize=256)
+def _resolve_internal_logger_name(name):
+    if not name:
+        return PACKAGE_NAME
+    else:
+        name = name.rsplit(".", maxsplit=1)[-1]
+        return PACKAGE_NAME + "." + name
+
+
+def _ensure_bootstrap():
+    """
+    Call `_bootstrap` upon first use of this module rather than at import time
+    """
+    global _bootstrapped
+
+    if not _bootstrapped:
+        with _bootstrap_lock:
+            if not _bootstrapped:
+                _bootstrap()
+                _bootstrapped = True
+
+
 def _bootstrap():
     """
     Create and initialize both the so-called "root" logger as well as this
@@ -66,8 +94,6 @@ def _bootstrap():
     # loggex.getLogger("chardet.charsetprober").setLevel(loggex.INFO)
 
 
-_bootstrap()
-
 # shorthands to standard log functions; initialized by _bootstrap()
 # critical = None
 # fatal = None
@@ -4,8 +4,9 @@
 import collections
 import contextlib
 import ipaddress
+import itertools
+import os
 import re
-import select
 import selectors
 import socket
 import threading
@@ -42,6 +43,24 @@ IPPROTO_UDP = socket.IPPROTO_UDP
 
 logger = logging.get_internal_logger(__name__)
 
+# max number of queued buffers to pass to a single sendmsg() call, or 0 if not
+# supported by the platform (i.e. Windows)
+_SENDMSG_MAX_BUFFERS = 64 if hasattr(socket.socket, "sendmsg") else 0
+
+# selector event masks of a client socket
+_EVENTS_READ = selectors.EVENT_READ
+_EVENTS_READWRITE = selectors.EVENT_READ | selectors.EVENT_WRITE
+
+# source of TcpServerClient tokens; unlike id(), a token is never reused, so
+# that a token that outlives its client (e.g. in a pending observer callback)
+# cannot designate a newer one. next() on it is atomic.
+_client_tokens = itertools.count(1)
+
+# used by string_to_netaddr_tuple(); loosy on purpose, addresses are validated
+# by ipaddress
+_IPV6_ADDR_REGEX = re.compile(r"^\[([0-9a-fA-F\:]+)\](?:\:(\d{1,5}))?$", re.A)
+_IPV4_ADDR_REGEX = re.compile(r"^([\d\.]+)(?:\:(\d{1,5}))?$", re.A)
+
 
 class NetAddr(_utils.NoDict):
     """Meant to be instantiated by `string_to_addresses`"""
@@ -112,31 +131,36 @@ class TcpNetAddr(NetAddr):
         super().__init__(family, SOCK_STREAM, IPPROTO_TCP, sockaddr)
 
 
-class TcpServerClient:
+class TcpServerClient(_utils.NoDict):
     """
     Represents a remote client connected to `TcpServer`.
 
     Used internally, instantiated by `TcpServer`.
+
+    Arbitrary data can be attached to it via its `data_bag` attribute.
     """
 
-    # __slots__ = (
-    #     "_token", "_sock", "_raddr", "_output_queue", "_input_queue",
-    #     "_must_update_selector", "_parent_weak", "_parent_lock", "data_bag")
+    __slots__ = (
+        "_token", "_sock", "_raddr", "_queues_lock", "_output_queue",
+        "_input_queue", "_must_update_selector", "_selector_events",
+        "_parent_weak", "_parent_lock", "_parent_waker", "data_bag",
+        "__weakref__")
 
-    def __init__(self, sock, raddr, parent, parent_lock):
+    def __init__(self, sock, raddr, parent, parent_lock, parent_waker):
         super().__init__()
 
-        self._token = id(self)
+        self._token = next(_client_tokens)
         self._sock = sock
         self._raddr = raddr
-        self._recv_buffer = bytearray(64 * 1024)
-        self._queues_lock = threading.RLock()
+        self._queues_lock = threading.Lock()
         self._output_queue = collections.deque()  # thread-safe
         self._input_queue = collections.deque()  # thread-safe
         self._must_update_selector = True
+        self._selector_events = 0  # 0 means not registered
 
         self._parent_weak = weakref.ref(parent)
         self._parent_lock = parent_lock
+        self._parent_waker = parent_waker  # does not refer to parent
 
         self.data_bag = None
 
@@ -170,13 +194,15 @@ class TcpServerClient:
         return self._raddr
 
     def recv(self):
+        # unlocked fast path: an emptiness check cannot observe a half-updated
+        # deque, and data being received concurrently will get notified
+        if not self._input_queue:
+            return collections.deque()
+
         with self._queues_lock:
-            if not self._input_queue:
-                return type(self._input_queue)()
-            else:
-                packets = self._input_queue
-                self._input_queue = type(self._input_queue)()
-                return packets
+            packets = self._input_queue
+            self._input_queue = collections.deque()
+            return packets
 
     def send(self, data):
         with self._queues_lock:
@@ -203,70 +229,76 @@ class TcpServerClient:
 
         with self._parent_lock:
             if self._must_update_selector:
-                flags = selectors.EVENT_READ
-
                 if self._output_queue:
-                    flags |= selectors.EVENT_WRITE
+                    events = _EVENTS_READWRITE
+                else:
+                    events = _EVENTS_READ
+
+                # spare a syscall if registration is up-to-date already
+                if events != self._selector_events:
+                    if self._selector_events:
+                        sel.modify(self._sock, events, data=self)
+                    else:
+                        sel.register(self._sock, events, data=self)
 
-                try:
-                    sel.modify(self._sock, flags, data=self)
-                except KeyError:
-                    sel.register(self._sock, flags, data=self)
+                    self._selector_events = events
 
                 self._must_update_selector = False
 
     def _notify_parent(self):
-        parent = self.parent
-        if parent is not None:
-            try:
-                parent._ioint_event.set()
-            except Exception:
-                pass
+        self._parent_waker.wakeup(self._token)
 
     def _safe_close(self, sel):
+        # note: the parent's lock is enough since it is the one that serializes
+        # selector updates; a concurrent send() may still enqueue data until it
+        # sees the socket is gone, which is harmless since a closed client is
+        # never flushed
         with self._parent_lock:
-            with self._queues_lock:
-                if self._sock is not None:
-                    safe_close_socket(self._sock, sel=sel)
-                    self._sock = None
-                    self._output_queue.clear()
-                    self._must_update_selector = False
+            if self._sock is not None:
+                safe_close_socket(self._sock, sel=sel)
+                self._sock = None
+                self._output_queue.clear()
+                self._must_update_selector = False
 
-    def _recv_impl(self, sel):
-        loop_idx = 0
-        view = memoryview(self._recv_buffer)
+    def _recv_impl(self, sel, view):
+        # note: *view* is the receive buffer shared by all the clients of the
+        # parent, which is fine since only its i/o thread reads from sockets,
+        # and data gets copied out of it before returning
+        packets = []
 
-        while True:
+        # read twice at most; the socket is non-blocking so a second read on a
+        # drained socket just raises BlockingIOError
+        for _ in range(2):
             sock = self._sock
             if sock is None:
-                return False
+                break
 
             try:
                 received = sock.recv_into(view)
             except (BlockingIOError, InterruptedError):
-                return False
+                break
             except Exception:
                 # logger.exception(f"failed to recv() from TCP client socket")
                 received = None  # close
 
             if not received:
                 self._safe_close(sel)
-                return False
+                break
 
-            data = view[:received].tobytes()
+            packets.append(view[:received].tobytes())
 
-            with self._queues_lock:
-                self._input_queue.append(data)
+            # a short read means the socket was drained, spare a syscall
+            if received < len(view):
+                break
 
-            if loop_idx >= 1:
-                return True
-            else:
-                loop_idx += 1
+        if not packets:
+            return False
 
-                if select.select((sock, ), (), (), 0)[0]:
-                    continue
+        # a single lock acquisition for the whole batch
+        with self._queues_lock:
+            self._input_queue.extend(packets)
 
-                return True
+        return not self.is_closed
 
     def _send_impl(self, sel):
         sock = self._sock
@@ -280,40 +312,45 @@ class TcpServerClient:
             output_queue = self._output_queue
             self._output_queue = type(self._output_queue)()
 
-        while True:
-            try:
-                data = output_queue.popleft()
-            except IndexError:
-                break
+        while output_queue:
+            # gather queued buffers so to flush them with a single syscall
+            if _SENDMSG_MAX_BUFFERS > 1 and len(output_queue) > 1:
+                buffers = list(
+                    itertools.islice(output_queue, _SENDMSG_MAX_BUFFERS))
+            else:
+                buffers = (output_queue[0], )
 
             try:
-                sent = sock.send(data)
-            except InterruptedError:
-                output_queue.appendleft(data)
+                if len(buffers) > 1:
+                    sent = sock.sendmsg(buffers)
+                else:
+                    sent = sock.send(buffers[0])
+            except (BlockingIOError, InterruptedError):
                 break
-            except BlockingIOError as exc:
-                try:
-                    sent = exc.characters_written
-                except AttributeError:
-                    sent = 0
-
-                if not sent:
-                    output_queue.appendleft(data)
-                    # logger.warning("aborted TCP send due to BlockingIOError")  # TEST
-                    break
             except Exception:
                 # logger.exception(f"failed to send() to TCP client socket")
                 sent = 0  # close
 
             if sent == 0:
-                output_queue.appendleft(data)
                 self._safe_close(sel)
                 break
-            elif sent < len(data):
-                data = data[sent:]
-                output_queue.appendleft(data)
-                # logger.warning("partial TCP send")  # TEST
-                break
+
+            # dequeue what has been sent
+            for data in buffers:
+                size = len(data)
+                if sent < size:
+                    # partial send; keep the remainder without copying it
+                    if sent > 0:
+                        output_queue[0] = memoryview(data)[sent:]
+                    break
+
+                output_queue.popleft()
+                sent -= size
+            else:
+                continue
+
+            # logger.warning("partial TCP send")  # TEST
+            break
 
         # restore output queue in case it could not be flushed completely
         if output_queue:
@@ -327,6 +364,112 @@ class TcpServerClient:
             return True
 
 
+class _EventFdMonitor(_utils.NoDict):
+    """`TcpServer` monitor based on a Linux ``eventfd``"""
+
+    __slots__ = ("_fd", )
+
+    def __init__(self):
+        super().__init__()
+        self._fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+
+    def fileno(self):
+        return self._fd
+
+    def wakeup(self):
+        os.eventfd_write(self._fd, 1)
+
+    def drain(self):
+        try:
+            os.eventfd_read(self._fd)  # resets the counter
+        except BlockingIOError:
+            pass
+
+        return True
+
+    def close(self):
+        with contextlib.suppress(Exception):
+            os.close(self._fd)
+
+
+class _SocketPairMonitor(_utils.NoDict):
+    """Portable `TcpServer` monitor based on a pair of connected sockets"""
+
+    __slots__ = ("_rsock", "_wsock")
+
+    def __init__(self):
+        super().__init__()
+        self._wsock, self._rsock = socket.socketpair()
+        self._wsock.setblocking(False)  # wakeup() must never block
+
+    def fileno(self):
+        return self._rsock.fileno()
+
+    def wakeup(self):
+        try:
+            self._wsock.send(b"\x00")
+        except BlockingIOError:
+            pass  # socket buffer is full, i/o thread is awake anyway
+
+    def drain(self):
+        try:
+            return bool(self._rsock.recv(256))
+        except InterruptedError:
+            return True
+
+    def close(self):
+        safe_close_socket(self._rsock)
+        safe_close_socket(self._wsock)
+
+
+class _Waker(_utils.NoDict):
+    """
+    Interrupts the ``select()`` call of `TcpServer`'s i/o thread by signaling
+    its monitor.
+
+    Shared by `TcpServer` with its clients so that they do not have to
+    dereference their parent in order to request a selector update.
+    """
+
+    __slots__ = ("monitor", "pending", "dirty_clients")
+
+    def __init__(self):
+        super().__init__()
+
+        self.monitor = None
+        self.pending = False
+
+        # tokens of the clients that need their selector registration updated;
+        # no lock: add() and pop() are atomic, and only the i/o thread pops
+        self.dirty_clients = set()
+
+    def wakeup(self, client_token=None):
+        """
+        Lock-free on purpose since `TcpServerClient.send` calls it while
+        holding its own lock. The monitor is signaled once until the i/o thread
+        drains it and resets `pending`, any request in between is a no-op.
+        """
+        if client_token is not None:
+            self.dirty_clients.add(client_token)
+
+        if self.pending:
+            return
+
+        self.pending = True
+
+        monitor = self.monitor
+        if monitor is not None:
+            try:
+                monitor.wakeup()
+                return
+            except Exception:
+                logger.exception("failed to signal monitor")
+
+        # the i/o loop recreates the monitor if needed and select() times out
+        # anyway
+        self.pending = False
+
+
 class TcpServerObserver(dispatcher.Observer):
     """
     A model of *observer* class for `TcpServer`.
@@ -388,18 +531,22 @@ class TcpServer(dispatcher.Dispatcher):
 
     This class relies on `selectors` to handle I/O events.
 
-    Internally, a pair of connected sockets - called "monitor sockets" here - is
-    created so that a ``select()`` call can be *interrupted* in case of data to
-    be sent on a socket.
+    Internally, an ``eventfd`` - or a pair of connected sockets on platforms
+    other than Linux - called "monitor" here is created so that a ``select()``
+    call can be *interrupted* in case of data to be sent on a socket.
+    Interruptions are requested directly by the thread that enqueues data, and
+    are coalesced until the I/O thread handles them.
     """
 
     DEFAULT_BIND = (TcpNetAddr(AF_INET, ("localhost", 8888)), )
     SELDATA_FOR_LISTENSOCK = None
     SELDATA_FOR_MONITORSOCK = False
+    RECV_BUFFER_SIZE = 64 * 1024
+    ACCEPT_BATCH_SIZE = 32
 
     def __init__(self, *, bind_addresses=DEFAULT_BIND,
                  allow_reuse_address=False, request_queue_size=25,
-                 observers=()):
+                 tcp_nodelay=True, observers=()):
         super().__init__(
             dispatcher_raise_errors=False,
             dispatcher_logger=logger,
@@ -428,31 +575,34 @@ class TcpServer(dispatcher.Dispatcher):
 
         # options
         self._request_queue_size = request_queue_size
+        self._tcp_nodelay = tcp_nodelay
 
         # low-level state
-        self._lock = threading.RLock()
+        # note: not reentrant, TcpServerClient objects acquire it too so it
+        # must not be held when calling their methods, except for send()
+        self._lock = threading.Lock()
         self._stop = False
-        self._ioint_event = threading.Event()
+        self._waker = _Waker()
         self._sel = selectors.DefaultSelector()
         self._bind_addresses = final_bind_addresses
         self._listening_sockets = listening_sockets
-        self._monitor_sockets = None
+        self._monitor = None
+        self._recv_view = memoryview(
+            bytearray(self.RECV_BUFFER_SIZE))  # i/o thread only
         self._clients = {}  # {client.token: client}
 
+        # create it early so that clients can wake up the i/o thread as soon
+        # as they get connected
+        with self._lock:
+            self._create_monitor()
+
         # i/o loop thread
         self._thread_io = threading.Thread(
             target=self._iothread_entry,
             name=self.__class__.__name__ + "[io]",
             daemon=True)
 
-        # "i/o interrupt" thread
-        self._thread_ioint = threading.Thread(
-            target=self._iointthread_entry,
-            name=self.__class__.__name__ + "[ioint]",
-            daemon=True)
-
         self._thread_io.start()
-        self._thread_ioint.start()
         time.sleep(0)  # yield
 
     def __del__(self):
@@ -467,7 +617,7 @@ class TcpServer(dispatcher.Dispatcher):
         """Request this server's own I/O handling thread to leave gracefully."""
         with self._lock:
             self._stop = True
-            self._ioint_event.set()
+            self._waker.wakeup()
 
     def is_alive(self):
         """Check if this server's own I/O handling thread is still running."""
@@ -490,38 +640,25 @@ class TcpServer(dispatcher.Dispatcher):
         Return `True` if threads were joind successfully or `False` on timeout,
         in case *timeout* is not `None`.
         """
-        start = time.monotonic()
-
         # self.request_termination()
 
         with self._lock:
-            if self._thread_io is None and self._thread_ioint is None:
+            if self._thread_io is None:
                 return True
 
             th_io = self._thread_io
-            th_ioint = self._thread_ioint
-
-        while True:
-            if th_io is not None and not th_io.is_alive():
-                th_io = None
 
-            if th_ioint is not None and not th_ioint.is_alive():
-                th_ioint = None
-
-            if th_io is None and th_ioint is None:
-                with self._lock:
-                    self._thread_io = None
-                    self._thread_ioint = None
+        if timeout is not None and timeout < 0:
+            timeout = None
 
-                return True
+        th_io.join(timeout)
+        if th_io.is_alive():
+            return False
 
-            # timeout?
-            if timeout is not None and timeout >= 0:
-                elapsed = time.monotonic() - start
-                if elapsed >= timeout:
-                    return False
+        with self._lock:
+            self._thread_io = None
 
-            time.sleep(0.1)
+        return True
 
     def send_to_client(self, client_token, data):
         """
@@ -540,39 +677,16 @@ class TcpServer(dispatcher.Dispatcher):
         """
         Close connection to the remote client specified by its *client_token*.
 
+        No ``_on_tcp_disconnected`` event is notified in that case.
+
         Raise `KeyError` if client is not found.
         """
+        # the client is forgotten right away since a closed socket does not get
+        # any event that would let the i/o thread release it
         with self._lock:
-            self._clients[client_token]._safe_close(self._sel)
-
-    def _iointthread_entry(self):
-        while True:
-            try:
-                self._iointthread_impl()
-                if self._stop:
-                    break
-            except Exception as exc:
-                logger.exception(
-                    f"exception raised in {self.__class__.__name__}'s "
-                    f"[i/o interrupt] thread")
-                time.sleep(2.0)
-
-    def _iointthread_impl(self):
-        while True:
-            with self._lock:
-                if self._stop:
-                    break
-
-            if self._ioint_event.wait():
-                if self._stop:
-                    break
+            client = self._clients.pop(client_token)
 
-                time.sleep(0)  # yield
-
-                if self._interrupt_select():
-                    self._ioint_event.clear()
-                else:
-                    time.sleep(0.25)
+        client._safe_close(self._sel)
 
     def _iothread_entry(self):
         try:
@@ -595,6 +709,11 @@ class TcpServer(dispatcher.Dispatcher):
                     sock, selectors.EVENT_READ,
                     data=self.SELDATA_FOR_LISTENSOCK)
 
+        # hot path: bind attributes to locals once for the whole loop
+        sel = self._sel
+        seldata_listen = self.SELDATA_FOR_LISTENSOCK
+        seldata_monitor = self.SELDATA_FOR_MONITORSOCK
+
         # i/o loop
         while True:
             with self._lock:
@@ -602,134 +721,156 @@ class TcpServer(dispatcher.Dispatcher):
                 if self._stop:
                     break
 
-                # ensure *monitor sockets* are created
-                if self._monitor_sockets is None:
-                    self._create_monitor_sockets()
+                # ensure *monitor* is created
+                if self._monitor is None:
+                    self._create_monitor()
 
-            # update the selector if needed
-            for client in self._clients.values():
-                if client._must_update_selector:
-                    client._update_selector(self._sel)
+            # update the selector for the clients that need it
+            dirty_clients = self._waker.dirty_clients
+            while dirty_clients:
+                client = self._clients.get(dirty_clients.pop())
+                if client is not None:
+                    client._update_selector(sel)
 
-            io_events = self._sel.select(timeout=1.0)
+            io_events = sel.select(timeout=1.0)
             # logger.debug(f"{self} select(): got {len(io_events)} events")
 
             for evt_key, evt_flags in io_events:
                 if self._stop:
                     break
 
-                if evt_key.data is self.SELDATA_FOR_LISTENSOCK:
+                evt_data = evt_key.data
+
+                if evt_data is seldata_listen:
                     # event on a listening socket
                     assert evt_key.fileobj in self._listening_sockets
                     self._on_accept(evt_key.fileobj)
-                elif evt_key.data is self.SELDATA_FOR_MONITORSOCK:
-                    # event on a monitor socket
-                    assert evt_key.fileobj in self._monitor_sockets
-                    self._on_monitor_io(evt_key, evt_flags)
+                elif evt_data is seldata_monitor:
+                    # event on the monitor
+                    assert evt_key.fileobj is self._monitor
+                    self._on_monitor_io(evt_key.fileobj, evt_flags)
                 else:
                     # event on a client connection
-                    self._on_client_io(evt_key, evt_flags)
+                    self._on_client_io(evt_data, evt_flags)
 
         # unregister, shutdown and close every socket
         self._close_all()
 
     def _on_accept(self, listen_sock):
-        sock, raddr = listen_sock.accept()
-        sock.setblocking(False)
+        accepted = []
+
+        # drain pending connections, in a bounded manner so that a connection
+        # storm does not starve connected clients
+        for _ in range(self.ACCEPT_BATCH_SIZE):
+            try:
+                sock, raddr = listen_sock.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                if not accepted:
+                    raise
+                break
 
-        client = TcpServerClient(sock, raddr, self, self._lock)
+            sock.setblocking(False)
+
+            # relayed traffic is mostly interactive, do not let Nagle's
+            # algorithm delay small packets
+            if self._tcp_nodelay:
+                with contextlib.suppress(OSError):
+                    sock.setsockopt(IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            client = TcpServerClient(
+                sock, raddr, self, self._lock, self._waker)
 
-        with self._lock:
             assert client._must_update_selector
             client._update_selector(self._sel)
-            self._clients[client.token] = client
 
-        self.notify_observers("_on_tcp_connected", self, client)
+            accepted.append(client)
+
+        if not accepted:
+            return
 
-    def _on_monitor_io(self, evt_key, evt_flags):
-        sock = evt_key.fileobj
+        with self._lock:
+            for client in accepted:
+                self._clients[client.token] = client
 
-        if evt_flags & selectors.EVENT_READ:
-            try:
-                data = sock.recv(256)
-                # TEST
-                # if data and len(data) > 5:
-                #     logger.warning(f"monitor socket received {len(data)} bytes")
-                # TESTEND
-            except InterruptedError:
-                return
+        for client in accepted:
+            self.notify_observers("_on_tcp_connected", self, client)
 
-            if not data:
-                logger.warning(f"duh?! reopening TCP monitor socket...")
+    def _on_monitor_io(self, monitor, evt_flags):
+        if evt_flags & selectors.EVENT_READ:
+            if not monitor.drain():
+                logger.warning(f"duh?! reopening TCP monitor...")
 
                 with self._lock:
-                    self._close_monitor_sockets()
-                    self._create_monitor_sockets()
-
-    def _on_client_io(self, evt_key, evt_flags):
-        client = evt_key.data
+                    self._close_monitor()
+                    self._create_monitor()
+
+            # reset only once drained: resetting before would let a concurrent
+            # wakeup() signal the monitor, have its signal drained here, and
+            # leave `pending` set for good, with nothing left to wake us up.
+            # A wakeup() call that lands between the drain and the reset is a
+            # no-op but its request is still handled since the loop checks
+            # the dirty clients before its next select()
+            self._waker.pending = False
+
+    def _on_client_io(self, client, evt_flags):
         data_received = False
 
         if client.is_closed:
             return  # duh?!
 
-        assert evt_key.fileobj is client.sock
-
         if evt_flags & selectors.EVENT_READ:
-            data_received = client._recv_impl(self._sel)
+            data_received = client._recv_impl(self._sel, self._recv_view)
 
         if not client.is_closed and (evt_flags & selectors.EVENT_WRITE):
             client._send_impl(self._sel)
 
+            # output queue got flushed
+            if client._must_update_selector:
+                self._waker.dirty_clients.add(client.token)
+
         if client.is_closed:
             self.notify_observers("_on_tcp_disconnected", self, client.token)
             with self._lock:
-                del self._clients[client.token]
+                # close_client() may have released it already
+                self._clients.pop(client.token, None)
         elif data_received:
             self.notify_observers("_on_tcp_recv", self, client)
 
-    def _create_monitor_sockets(self):
-        with self._lock:
-            if self._monitor_sockets is not None:
-                self._close_monitor_sockets()
-
-            try:
-                self._monitor_sockets = socket.socketpair()
-            except Exception:
-                logger.exception(
-                    f"{self.__class__.__name__} failed to create a pair of "
-                    f"monitor sockets pair")
+    def _create_monitor(self):
+        # CAUTION: caller must hold self._lock
+        if self._monitor is not None:
+            self._close_monitor()
 
-            for sock in self._monitor_sockets:
-                self._sel.register(
-                    sock, selectors.EVENT_READ,
-                    data=self.SELDATA_FOR_MONITORSOCK)
+        try:
+            if hasattr(os, "eventfd"):
+                monitor = _EventFdMonitor()
+            else:
+                monitor = _SocketPairMonitor()
+        except Exception:
+            logger.exception(
+                f"{self.__class__.__name__} failed to create its monitor")
+            return
 
-    def _close_monitor_sockets(self):
-        with self._lock:
-            if self._monitor_sockets is None:
-                return
+        self._sel.register(
+            monitor, selectors.EVENT_READ, data=self.SELDATA_FOR_MONITORSOCK)
 
-            safe_close_socket(self._monitor_sockets[0], sel=self._sel)
-            safe_close_socket(self._monitor_sockets[1], sel=self._sel)
+        self._monitor = monitor
+        self._waker.monitor = monitor
 
-            self._monitor_sockets = None
+    def _close_monitor(self):
+        # CAUTION: caller must hold self._lock
+        if self._monitor is None:
+            return
 
-    def _interrupt_select(self):
-        with self._lock:
-            if self._monitor_sockets is None:
-                self._create_monitor_sockets()
+        self._waker.monitor = None
 
-            if self._monitor_sockets is not None:
-                try:
-                    self._monitor_sockets[0].send(b"\x00")
-                    return True
-                except InterruptedError:
-                    pass
-                except Exception:
-                    logger.exception("failed to write to monitor socket")
+        with contextlib.suppress(Exception):
+            self._sel.unregister(self._monitor)
 
-            return False
+        self._monitor.close()
+        self._monitor = None
 
     def _close_all(self):
         with self._lock:
@@ -739,19 +880,20 @@ class TcpServer(dispatcher.Dispatcher):
 
                 self._listening_sockets = []
 
-            if self._clients:
-                for client in self._clients.values():
-                    client._safe_close(self._sel)
-
-                self._clients = {}
+            self._close_monitor()
 
-            self._close_monitor_sockets()
+            sel = self._sel
+            clients = self._clients
+            self._sel = None
+            self._clients = {}
 
-            if self._sel is not None:
-                with contextlib.suppress(Exception):
-                    self._sel.close()
+        # outside of the lock since clients acquire it
+        for client in clients.values():
+            client._safe_close(sel)
 
-                self._sel = None
+        if sel is not None:
+            with contextlib.suppress(Exception):
+                sel.close()
 
 
 def safe_close_socket(sock, *, sel=None):
@@ -779,9 +921,7 @@ def string_to_netaddr_tuple(addr_string):
 
     # IPv6?
     if af is None:
-        rem = re.fullmatch(
-            r"^\[([0-9a-fA-F\:]+)\](?:\:(\d{1,5}))?$",  # loosy check
-            addr_string, re.A)
+        rem = _IPV6_ADDR_REGEX.fullmatch(addr_string)
         if rem:
             af = AF_INET6
             addr = rem.group(1)
@@ -794,13 +934,7 @@ def string_to_netaddr_tuple(addr_string):
 
     # IPv4?
     if af is None:
-        # regex is loosy on purpose
-        # address will be validated by ipaddress
-        rem = re.fullmatch(
-            # r"^(\d{1,3}(?:\.\d{1,3}){1,3})(?:\:\d{1,5})?$",
-            r"^([\d\.]+)(?:\:\d{1,5})?$",
-            addr_string, re.A)
-
+        rem = _IPV4_ADDR_REGEX.fullmatch(addr_string)
         if rem:
             af = AF_INET
             addr = rem.group(1)
@@ -1,11 +1,12 @@
 # Copyright (c) Lexfo
 # SPDX-License-Identifier: BSD-3-Clause
 
+import collections
 import concurrent.futures
 import functools
 import os
 import threading
-import weakref
+import time
 
 from . import _utils
 from . import logging
@@ -17,27 +18,50 @@ __all__ = ("ThreadPool", "MethodCallTask", "FunctionCallTask", "PoolTaskBase")
 logger = logging.get_internal_logger(__name__)
 
 
+def _bind_callee(func, args, kwargs):
+    # bound once at task's construction so that worker threads just have to
+    # call it
+    if not args and not kwargs:
+        return func
+
+    return functools.partial(func, *args, **kwargs)
+
+
 class PoolTaskBase(_utils.NoDict):
-    __slots__ = ("pool_ref", "label", "future")
+    # note: fields used by worker threads come first
+    __slots__ = ("future", "_callee", "_label", "pool")
 
     def __init__(self, pool):
         super().__init__()
 
-        self.pool_ref = weakref.ref(pool)
-        self.label = self.__class__.__name__
         self.future = None
+        self._callee = None  # to be bound by derived classes
+        self._label = None  # see label property
+
+        # note: a plain reference is enough, the pool only holds the task until
+        # it is done and handed over to the tasks-done callback
+        self.pool = pool
 
     @property
-    def pool(self):
-        return self.pool_ref()  # may be None
+    def label(self):
+        # built on first use only since it is needed by error paths only
+        if self._label is None:
+            self._label = self._make_label()
+
+        return self._label
+
+    def _make_label(self):
+        return self.__class__.__name__
 
     def get_callee(self):
-        raise NotImplementedError
+        if self._callee is None:
+            raise NotImplementedError
 
-    def submit(self, executor):
-        if not isinstance(executor, concurrent.futures.Executor):
-            raise ValueError("executor")
+        return self._callee
 
+    def submit(self, executor):
+        # note: *executor* is not type-checked, only ThreadPool calls this with
+        # the executor it created itself
         if self.future is not None:
             raise RuntimeError(f"task {self.label} already submitted")
 
@@ -62,13 +86,11 @@ class PoolTaskBase(_utils.NoDict):
 
     def _on_done(self, future):
         # notify the parent pool object
-        pool = self.pool
-        if pool is not None:
-            pool._on_future_done(future)
+        self.pool._on_task_done(self)
 
 
 class MethodCallTask(PoolTaskBase):
-    __slots__ = ("method_name", "method_ref", "args", "kwargs")
+    __slots__ = ("method", "args", "kwargs", "obj", "method_name")
 
     def __init__(self, pool, obj, method_name, *args, **kwargs):
         super().__init__(pool)
@@ -83,25 +105,19 @@ class MethodCallTask(PoolTaskBase):
                 f"{_utils.get_fullname(obj)}.{method_name} does not designate "
                 f"a callable")
 
-        self.method_name = method_name
-        self.method_ref = weakref.WeakMethod(method)
+        self.method = method
         self.args = args
         self.kwargs = kwargs
+        self.obj = obj
+        self.method_name = method_name
+        self._callee = _bind_callee(method, args, kwargs)
 
-        # update task's label
-        self.label = "{}.{}".format(
-            _utils.get_fullname(obj), method_name)
-
-    def get_callee(self):
-        method = self.method_ref()
-        if method is None:
-            return None
-
-        return functools.partial(method, *self.args, **self.kwargs)
+    def _make_label(self):
+        return "{}.{}".format(_utils.get_fullname(self.obj), self.method_name)
 
 
 class FunctionCallTask(PoolTaskBase):
-    __slots__ = ("func_ref", "args", "kwargs")
+    __slots__ = ("func", "args", "kwargs")
 
     def __init__(self, pool, func, *args, **kwargs):
         super().__init__(pool)
@@ -109,19 +125,13 @@ class FunctionCallTask(PoolTaskBase):
         if not callable(func):
             raise ValueError(f"{_utils.get_fullname(func)} not a callable")
 
-        self.func_ref = weakref.ref(func)
+        self.func = func
         self.args = args
         self.kwargs = kwargs
+        self._callee = _bind_callee(func, args, kwargs)
 
-        # update task's label
-        self.label = "<callable:{}>".format(_utils.get_fullname(func))
-
-    def get_callee(self):
-        func = self.func_ref()
-        if func is None:
-            return None
-
-        return functools.partial(func, *self.args, **self.kwargs)
+    def _make_label(self):
+        return "<callable:{}>".format(_utils.get_fullname(self.func))
 
 
 class _DoneTasksCallbackTask(FunctionCallTask):
@@ -130,9 +140,9 @@ class _DoneTasksCallbackTask(FunctionCallTask):
     def __init__(self, pool, callback, done_tasks):
         super().__init__(pool, callback, done_tasks)
 
-        # update task's label
-        self.label = "<done_tasks_callback:{}>".format(
-            _utils.get_fullname(callback))
+    def _make_label(self):
+        return "<done_tasks_callback:{}>".format(
+            _utils.get_fullname(self.func))
 
     @property
     def done_tasks(self):
@@ -145,30 +155,57 @@ class ThreadPool:
     fashion
     """
 
-    def __init__(self, *, max_workers=None, tasks_done_callback=None):
+    # tasks-done callback is called with batches of up to this many tasks...
+    DONE_TASKS_BATCH_SIZE = 64
+
+    # ... or with whatever is done already once the first task of a batch has
+    # been waiting for this long (seconds)
+    DONE_TASKS_BATCH_DELAY = 0.005
+
+    # the maintenance thread wakes up at least this often (seconds) even if it
+    # does not get notified, as a safety net against a lost wakeup
+    MAINTENANCE_INTERVAL = 1.0
+
+    def __init__(self, *, max_workers=None, max_in_flight=None,
+                 tasks_done_callback=None):
         if max_workers is None or max_workers == 0:
             max_workers = (os.cpu_count() or 1) * 3
             max_workers = min(32, max_workers)
         elif not isinstance(max_workers, int) or max_workers < 0:
             raise ValueError("max_workers")
 
+        # we do not want to flood the ThreadPoolExecutor object as stress tests
+        # have shown that it does not deal well with a huge number of tasks in
+        # its queue(s) (i.e. 1_000_000), but it must be fed enough to keep its
+        # workers busy when tasks are short-lived
+        #
+        # test environment: CPython 3.8.0 x64 on Windows 10
+        if max_in_flight is None or max_in_flight == 0:
+            max_in_flight = max(64, max_workers * 4)
+        elif not isinstance(max_in_flight, int) or max_in_flight < 0:
+            raise ValueError("max_in_flight")
+
         if tasks_done_callback is not None and not callable(tasks_done_callback):
             raise ValueError("tasks_done_callback")
 
         # config
         self._max_workers = max_workers
+        self._max_in_flight = max_in_flight
         self._tasks_done_callback = tasks_done_callback
 
         # low-level state
-        self._lock = threading.RLock()
+        self._lock = threading.Lock()
         self._quit = False
         self._quit_on_idle = False
         self._event = threading.Event()
 
         # pools of objects
-        self._tasks_inbox = []
-        self._tasks_running = {}  # collections.OrderedDict()  # {future: task}
+        self._priority_inbox = collections.deque()  # _DoneTasksCallbackTask
+        self._tasks_inbox = collections.deque()
+        self._tasks_running = set()  # tasks hold their own future
+        self._tasks_finished = collections.deque()  # fed by _on_task_done()
         self._tasks_done = []
+        self._tasks_done_deadline = None  # time.monotonic() based
 
         # maintenance thread
         self._thread = threading.Thread(
@@ -315,31 +352,56 @@ class ThreadPool:
         if not isinstance(task, PoolTaskBase):
             raise ValueError(f"{_utils.get_fullname(task)} not a PoolTaskBase")
 
+        # no need to hold the lock: reading a flag is atomic and so is
+        # deque.append(), the maintenance thread being the only consumer. A task
+        # pushed while termination is being requested is just never run, as if
+        # it had been pushed right after.
+        if self._quit:
+            return False
+
+        if self._try_submit_directly(task):
+            # the maintenance thread will be notified once the task is done
+            return True
+        else:
+            self._tasks_inbox.append(task)
+
+        self._wakeup()
+        return True
+
+    def _try_submit_directly(self, task):
+        # fast path: submit *task* to the executor right away, sparing it a
+        # round trip through the maintenance thread, as long as no task is
+        # queued before it and the executor has room for it
+        #
+        # note: the unlocked checks are only hints, they are done again once
+        # the lock is held
+        if (self._priority_inbox or self._tasks_inbox or
+                self._count_in_flight() >= self._max_in_flight):
+            return False
+
         with self._lock:
-            if not self._quit:
-                # _DoneTasksCallbackTask task is high priority and inserted
-                # after existing _DoneTasksCallbackTask tasks
-                if isinstance(task, _DoneTasksCallbackTask):
-                    for idx, tsk in enumerate(self._tasks_inbox):
-                        if not isinstance(tsk, _DoneTasksCallbackTask):
-                            self._tasks_inbox.insert(idx, task)
-                            break
-                    else:
-                        self._tasks_inbox.append(task)
-                else:
-                    self._tasks_inbox.append(task)
+            # note: the lock also guarantees the maintenance thread cannot
+            # flush this task as finished before it gets registered as running
+            if (self._quit or
+                    self._executor is None or
+                    self._priority_inbox or
+                    self._tasks_inbox or
+                    self._count_in_flight() >= self._max_in_flight):
+                return False
 
-                self._event.set()
-                return True
+            if task.submit(self._executor) is None:
+                return False
 
-        return False
+            self._tasks_running.add(task)
+            return True
 
     def _thread_main(self):
         while True:
             # should we leave unconditionally?
-            with self._lock:
-                if self._quit:
-                    break
+            # note: no need to lock to read a flag, request_termination() wakes
+            # us up anyway once it is set
+            if self._quit:
+                break
 
             # wait for an event
             # logger.debug(
@@ -347,7 +409,11 @@ class ThreadPool:
             #         len(self._tasks_inbox),
             #         len(self._tasks_running),
             #         len(self._tasks_done)))
-            self._event.wait()
+            timeout = self.MAINTENANCE_INTERVAL
+            deadline = self._tasks_done_deadline
+            if deadline is not None:
+                timeout = min(timeout, max(0, deadline - time.monotonic()))
+            self._event.wait(timeout)
             # logger.debug(
             #     "maintenance thread woke up (in:{}, run:{}, done:{})...".format(
             #         len(self._tasks_inbox),
@@ -355,21 +421,19 @@ class ThreadPool:
             #         len(self._tasks_done)))
 
             # clear the event flag and check if we should leave
-            with self._lock:
-                self._event.clear()
-                if self._quit:
-                    break
+            self._event.clear()
+            if self._quit:
+                break
 
-            # flush tasks queues
+            # flush tasks queues, and leave if idle and requested to
             with self._lock:
                 self._thread_main__flush_running_tasks()
                 self._thread_main__flush_done_tasks()
                 self._thread_main__flush_tasks_inbox()
 
-            # idle? should we leave?
-            with self._lock:
                 if (self._quit_on_idle and
                         not self._event.is_set() and
+                        0 == len(self._priority_inbox) and
                         0 == len(self._tasks_inbox) and
                         0 == len(self._tasks_running) and
                         0 == len(self._tasks_done)):
@@ -382,80 +446,115 @@ class ThreadPool:
         return 0
 
     def _thread_main__flush_running_tasks(self):
-        # move tasks from *running* to *done* list
-        with self._lock:
-            must_notify = False
-
-            # note: items are copied to a list so that _tasks_running can be
-            # safely modified during the loop
-            for future, task in list(self._tasks_running.items()):
-                if future.done():
-                    self._tasks_done.append(task)
-                    del self._tasks_running[future]
-                    must_notify = True
+        # CAUTION: caller must hold self._lock
+        # move finished tasks from *running* to *done* list
+        # note: the deque cannot be swapped since _on_task_done() does not lock,
+        # only pop what is there already and then update the other containers in
+        # bulk
+        finished = self._tasks_finished
+        count = len(finished)
 
-            if must_notify:
-                self._event.set()
+        if count > 0:
+            popleft = finished.popleft
+            finished = [popleft() for _ in range(count)]
 
-    def _thread_main__flush_done_tasks(self):
-        done_tasks = []
-        callback = None
+            self._tasks_running.difference_update(finished)
 
-        with self._lock:
-            if self._tasks_done:
-                done_tasks = self._tasks_done
-                self._tasks_done = []
+            # filter out _DoneTasksCallbackTask objects to avoid infinite
+            # recursive calls
+            self._tasks_done.extend(
+                t for t in finished
+                if not isinstance(t, _DoneTasksCallbackTask))
 
-                self._event.set()
+            self._wakeup()
 
-                callback = self._tasks_done_callback
+    def _thread_main__flush_done_tasks(self):
+        # CAUTION: caller must hold self._lock
+        if not self._tasks_done:
+            return
+
+        callback = self._tasks_done_callback
+
+        # batch done tasks so that the executor does not get flooded with tiny
+        # callback tasks under a high completion rate, unless we are about to
+        # leave
+        if (callback is not None and
+                not self._quit_on_idle and
+                len(self._tasks_done) < self.DONE_TASKS_BATCH_SIZE):
+            now = time.monotonic()
+            if self._tasks_done_deadline is None:
+                self._tasks_done_deadline = now + self.DONE_TASKS_BATCH_DELAY
+                return
+            elif now < self._tasks_done_deadline:
+                return
+
+        done_tasks = self._tasks_done
+        self._tasks_done = []
+        self._tasks_done_deadline = None
 
-        if done_tasks and callback is not None:
-            # filter out _DoneTasksCallbackTask objects to avoid infinite
-            # recursive calls
-            done_tasks = [
-                t for t in done_tasks
-                if not isinstance(t, _DoneTasksCallbackTask)]
+        self._wakeup()
 
-            if done_tasks:
-                done = _DoneTasksCallbackTask(self, callback, done_tasks)
-                self.push_task(done)
+        if callback is not None:
+            # _DoneTasksCallbackTask task is high priority and submitted after
+            # existing _DoneTasksCallbackTask tasks, push_task() is not needed
+            # since we are the one who drains the inboxes
+            done = _DoneTasksCallbackTask(self, callback, done_tasks)
+            self._priority_inbox.append(done)
 
     def _thread_main__flush_tasks_inbox(self):
-        with self._lock:
-            if not self._quit and self._executor is not None:
-                # we do not want to flood the ThreadPoolExecutor object as
-                # stress tests have shown that it does not deal well with a huge
-                # number of tasks in its queue(s) (i.e. 1_000_000)
-                #
-                # test environment: CPython 3.8.0 x64 on Windows 10
-                MAX_SUBMITTED_TASKS = self._max_workers * 2
-
-                if len(self._tasks_running) >= MAX_SUBMITTED_TASKS:
-                    # there is no need to _event.set() here because this will be
-                    # done upon next task termination, and we know that there is
-                    # at least one running task
-                    return
-
-                must_notify = False
-
-                while len(self._tasks_inbox) > 0:
-                    task = self._tasks_inbox.pop(0)
-                    future = task.submit(self._executor)
-                    if future is not None:
-                        self._tasks_running[future] = task
-                        must_notify = True
-
-                        # again, do not mess up with ThreadPoolExecutor!!!
-                        if len(self._tasks_running) >= MAX_SUBMITTED_TASKS:
-                            break
-
-                if must_notify:
-                    self._event.set()
-
-    def _on_future_done(self, future):
+        # CAUTION: caller must hold self._lock
+        if self._quit or self._executor is None:
+            return
+
+        max_in_flight = self._max_in_flight
+
+        if self._count_in_flight() >= max_in_flight:
+            # there is no need to _event.set() here because this will be
+            # done upon next task termination, and we know that there is
+            # at least one running task
+            return
+
+        must_notify = False
+
+        # drain high priority tasks first
+        for inbox in (self._priority_inbox, self._tasks_inbox):
+            while inbox:
+                task = inbox.popleft()
+                future = task.submit(self._executor)
+                if future is not None:
+                    self._tasks_running.add(task)
+                    must_notify = True
+
+                    # again, do not mess up with ThreadPoolExecutor!!!
+                    if self._count_in_flight() >= max_in_flight:
+                        break
+            else:
+                continue
+
+            break
+
+        if must_notify:
+            self._wakeup()
+
+    def _count_in_flight(self):
+        # tasks submitted to the executor and not done yet
+        # note: tasks handed over by _on_task_done() are still in the running
+        # set until the maintenance thread flushes them, do not count them
+        return len(self._tasks_running) - len(self._tasks_finished)
+
+    def _wakeup(self):
+        # coalesce wakeup requests: setting an Event that is set already still
+        # acquires its lock and notifies its waiters. Checking the flag first
+        # is safe since the maintenance thread clears it *before* flushing.
+        if not self._event.is_set():
+            self._event.set()
+
+    def _on_task_done(self, task):
         # No need to clean up the _tasks_running list here, this is done by the
         # maintenance thread as long as it gets notified.
-        # So keep this method as lightweight and fast as possible.
-        with self._lock:
-            self._event.set()
+        # So keep this method as lightweight and fast as possible, and do not
+        # contend for the pool's lock with producers and the maintenance thread.
+        # Handing the task over spares the maintenance thread from scanning
+        # every running task to find the finished ones.
+        self._tasks_finished.append(task)  # thread-safe
+        self._wakeup()
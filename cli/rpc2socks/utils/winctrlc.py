@@ -26,7 +26,12 @@ __all__ = (
 _IS_WINDOWS = os.name == "nt"
 _lock = threading.Lock()
 _installed = False
-_user_handlers = []
+# {id(handler): handler}; insertion-ordered; ids are safe to use as keys since
+# handlers are held by the dict itself
+_user_handlers = {}
+# copy-on-write snapshot of _user_handlers, in calling order (i.e. last
+# registered first), so that _winctrl_handler() does not have to lock
+_user_handlers_snapshot = ()
 
 
 def winctrlc_is_installed():
@@ -44,11 +49,11 @@ def winctrlc_register_callback(user_handler):
         if not _installed:
             return False
 
-        for hdlr in _user_handlers:
-            if hdlr is user_handler:
-                return True
+        if id(user_handler) in _user_handlers:
+            return True
 
-        _user_handlers.append(user_handler)
+        _user_handlers[id(user_handler)] = user_handler
+        _publish_handlers()
 
         return True
 
@@ -57,29 +62,33 @@ def winctrlc_unregister_callback(user_handler):
     global _user_handlers
 
     with _lock:
-        for idx, hdlr in enumerate(_user_handlers):
-            if hdlr is user_handler:
-                del _user_handlers[idx]
-                return True
+        if _user_handlers.pop(id(user_handler), None) is None:
+            return False
 
-    return False
+        _publish_handlers()
+        return True
 
 
 def winctrlc_unregister_all_callbacks():
     global _user_handlers
 
     with _lock:
-        _user_handlers = []
+        _user_handlers = {}
+        _publish_handlers()
+
+
+def _publish_handlers():
+    # CAUTION: caller must hold _lock
+    global _user_handlers_snapshot
+    _user_handlers_snapshot = tuple(reversed(list(_user_handlers.values())))
 
 
 if _IS_WINDOWS:
     @ctypes.WINFUNCTYPE(ctypes.c_long, ctypes.c_uint)
     def _winctrl_handler(dwCtrlType):
         if dwCtrlType in (0, 2):  # (CTRL_C_EVENT, CTRL_CLOSE_EVENT)
-            with _lock:
-                handlers = _user_handlers[:]
-
-            for hdlr in reversed(handlers):
+            # no lock needed, the snapshot is replaced, never modified
+            for hdlr in _user_handlers_snapshot:
                 try:
                     if hdlr():
                         break
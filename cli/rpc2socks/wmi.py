@@ -1,7 +1,6 @@
 # Copyright (c) Lexfo
 # SPDX-License-Identifier: BSD-3-Clause
 
-import contextlib
 import time
 
 from impacket.dcerpc.v5 import dtypes as impkt_dtypes
@@ -18,7 +17,8 @@ logger = logging.get_internal_logger(__name__)
 
 
 def wmi_rexec(smb_config, cmdline, *,
-              workdir="C:\\", wait=False, wait_poll_delay=2.0):
+              workdir="C:\\", wait=False, wait_poll_delay=2.0,
+              wait_initial_delay=0.25):
     assert isinstance(smb_config, smb.SmbConfig)
 
     if wait is True:
@@ -57,26 +57,37 @@ def wmi_rexec(smb_config, cmdline, *,
         create_result = win32Process.Create(cmdline, workdir, None)
         child_pid = create_result.getProperties()["ProcessId"]["value"]
 
-        logger.info(f"created remote process {child_pid}")
-        logger.debug(f"cmdline: {cmdline}")
+        logger.info("created remote process %s", child_pid)
+        logger.debug("cmdline: %s", cmdline)
 
         if wait:
-            logger.debug(f"waiting for remote process {child_pid} to terminate")
+            logger.debug(
+                "waiting for remote process %s to terminate", child_pid)
 
             wait_start = time.monotonic()
 
+            # back off exponentially from *wait_initial_delay* up to
+            # *wait_poll_delay* so that short-lived processes are detected
+            # quickly, without issuing too many queries for long-lived ones
+            poll_delay = min(wait_initial_delay, wait_poll_delay)
+
             while True:
                 iEnumWbemClassObject = iWbemServices.ExecQuery(
                     f"SELECT * FROM Win32_Process WHERE handle = {child_pid}")
 
                 try:
-                    child = iEnumWbemClassObject.Next(0xffffffff, 1)[0]
+                    children = iEnumWbemClassObject.Next(0xffffffff, 1)
+                    if not children:
+                        return True  # wait successful
+                    child = children[0]
                 except impkt_wmi.DCERPCSessionError as exc:
+                    # note: this is how impacket reports an exhausted
+                    # enumerator, the check above is for an empty reply
                     if exc.error_code == 1:  # == WBEM_S_FALSE
                         return True  # wait successful
                     else:
                         logger.exception(
-                            f"failed to wait for remote process {child_pid}")
+                            "failed to wait for remote process %s", child_pid)
                         return False  # wait failed
 
                 # TEST
@@ -87,32 +98,43 @@ def wmi_rexec(smb_config, cmdline, *,
                 # TESTEND
 
                 if wait is not True:
-                    elapsed = time.monotonic() - wait_start
-                    if elapsed >= wait:
+                    remaining = wait - (time.monotonic() - wait_start)
+                    if remaining <= 0:
                         return False
 
-                time.sleep(wait_poll_delay)
+                    # do not oversleep past the *wait* delay
+                    time.sleep(min(poll_delay, remaining))
+                else:
+                    time.sleep(poll_delay)
+
+                poll_delay = min(poll_delay * 2, wait_poll_delay)
 
         return True  # execution successful
     except Exception as exc:
         if logger.isEnabledFor(logging.DEBUG):
-            logger.exception(f"failed to execute remote command: {cmdline}")
+            logger.exception("failed to execute remote command: %s", cmdline)
         else:
-            logger.error(f"failed to execute remote command: {cmdline}")
-            logger.error(f"error was: {exc}")
-            logger.error("enable full verbose mode for more info")
+            logger.error(
+                "failed to execute remote command: %s\n"
+                "error was: %s\n"
+                "enable full verbose mode for more info",
+                cmdline, exc)
         return None  # an error occurred
     finally:
         win32Process = None
 
         if iWbemServices is not None:
-            with contextlib.suppress(Exception):
+            try:
                 iWbemServices.disconnect()
+            except Exception:
+                pass
             iWbemServices = None
 
         if dcom_conn is not None:
-            with contextlib.suppress(Exception):
+            try:
                 dcom_conn.disconnect()
+            except Exception:
+                pass
             dcom_conn = None
 
     return None  # an error occurred